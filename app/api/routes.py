@@ -1,13 +1,16 @@
-from fastapi import APIRouter, UploadFile, File, Depends, HTTPException, BackgroundTasks
+from fastapi import APIRouter, UploadFile, File, Depends, HTTPException, Header, Response
 from fastapi.responses import StreamingResponse, JSONResponse
 from sqlalchemy.orm import Session
 from ..database.database import get_db
 from ..database.models import AudioFile
-from ..services.audio_service import AudioDatabaseService, process_audio_enhancement
+from ..services.database_service import AudioDatabaseService
+from ..services.inference_worker import inference_worker
 from ..models.schemas import AudioFileUploadResponse, AudioFileStatusResponse, AudioFileResponse
+import hashlib
 import io
 import logging
-from typing import List
+import os
+from typing import List, Optional
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -16,6 +19,11 @@ router = APIRouter()
 ALLOWED_EXTENSIONS = {".wav"}
 MAX_FILE_SIZE = 50 * 1024 * 1024  # 50MB
 
+# Duplicate upload detection
+MAX_IDEMPOTENCY_KEY_LENGTH = 255
+IDEMPOTENCY_KEY_TTL = int(os.getenv("IDEMPOTENCY_KEY_TTL_SECONDS", 24 * 60 * 60))
+DUPLICATE_UPLOAD_WINDOW = int(os.getenv("DUPLICATE_UPLOAD_WINDOW_SECONDS", 10 * 60))
+
 def validate_audio_file(file: UploadFile) -> bool:
     """Validate uploaded file"""
     # Check file extension
@@ -27,8 +35,9 @@ def validate_audio_file(file: UploadFile) -> bool:
 
 @router.post("/upload", response_model=AudioFileUploadResponse)
 async def upload_audio_file(
-    background_tasks: BackgroundTasks,
+    response: Response,
     file: UploadFile = File(...),
+    idempotency_key: Optional[str] = Header(None),
     db: Session = Depends(get_db)
 ):
     """Upload audio file for enhancement"""
@@ -40,6 +49,12 @@ async def upload_audio_file(
                 detail="Invalid file. Only .wav files are supported."
             )
         
+        if idempotency_key is not None and not 0 < len(idempotency_key) <= MAX_IDEMPOTENCY_KEY_LENGTH:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Idempotency-Key must be 1-{MAX_IDEMPOTENCY_KEY_LENGTH} characters"
+            )
+        
         # Read file contents
         file_contents = await file.read()
         
@@ -53,12 +68,45 @@ async def upload_audio_file(
         if len(file_contents) == 0:
             raise HTTPException(status_code=400, detail="Empty file uploaded")
         
-        # Store in database
         db_service = AudioDatabaseService()
+        content_hash = hashlib.sha256(file_contents).hexdigest()
+        
+        # Retried or repeated uploads attach to the existing file and its running job
+        try:
+            existing = db_service.find_duplicate_upload(db, idempotency_key, content_hash, IDEMPOTENCY_KEY_TTL)
+        except ValueError as e:
+            raise HTTPException(status_code=422, detail=str(e))
+        if existing:
+            return duplicate_upload_response(response, existing)
+        
+        # Store in database
         audio_file = db_service.create_audio_file(db, file.filename, file_contents)
+        file_id = str(audio_file.id)
+        
+        try:
+            owner_id = db_service.register_upload_keys(
+                db, file_id, idempotency_key, content_hash,
+                IDEMPOTENCY_KEY_TTL, DUPLICATE_UPLOAD_WINDOW
+            )
+        except Exception as e:
+            # Never leave a row behind that keys may point at but nothing will process
+            db.rollback()
+            db_service.delete_audio_file(db, file_id)
+            if isinstance(e, ValueError):
+                raise HTTPException(status_code=422, detail=str(e))
+            raise
+        
+        if owner_id != file_id:
+            # A concurrent request with the same key or content won the race, keep its file instead
+            owner = db_service.get_audio_file(db, owner_id)
+            if owner:
+                db_service.delete_audio_file(db, file_id)
+                return duplicate_upload_response(response, owner)
+            # The winner's file was deleted meanwhile, so this upload goes ahead on its own
+            logger.warning(f"⚠️ Upload key owner {owner_id} no longer exists, keeping {audio_file.id}")
         
-        # Start background enhancement process
-        background_tasks.add_task(process_audio_enhancement, db, str(audio_file.id))
+        # Hand off to the inference worker process
+        inference_worker.submit(file_id)
         
         return AudioFileUploadResponse(
             message="File uploaded successfully. Enhancement in progress.",
@@ -74,6 +122,18 @@ async def upload_audio_file(
         logger.error(f"Upload failed: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Upload failed: {str(e)}")
 
+def duplicate_upload_response(response: Response, audio_file: AudioFile) -> AudioFileUploadResponse:
+    """Build the upload response for a request that matched an earlier upload"""
+    response.headers["Idempotent-Replayed"] = "true"
+    logger.info(f"♻️ Duplicate upload, returning existing file {audio_file.id}")
+    return AudioFileUploadResponse(
+        message="File already uploaded. Returning the existing enhancement.",
+        file_id=audio_file.id,
+        filename=audio_file.original_filename,
+        file_size=audio_file.file_size,
+        status=audio_file.status
+    )
+
 @router.get("/status/{file_id}", response_model=AudioFileStatusResponse)
 async def get_audio_status(file_id: str, db: Session = Depends(get_db)):
     """Get processing status of audio file"""
@@ -196,13 +256,9 @@ async def list_audio_files(db: Session = Depends(get_db)):
 async def delete_audio_file(file_id: str, db: Session = Depends(get_db)):
     """Delete audio file"""
     try:
-        audio_file = db.query(AudioFile).filter(AudioFile.id == file_id).first()
-        if not audio_file:
+        if not AudioDatabaseService.delete_audio_file(db, file_id):
             raise HTTPException(status_code=404, detail="Audio file not found")
         
-        db.delete(audio_file)
-        db.commit()
-        
         return {"message": "Audio file deleted successfully"}
         
     except HTTPException:
@@ -20,3 +20,29 @@ class AudioFile(Base):
     
     def __repr__(self):
         return f"<AudioFile(id={self.id}, filename={self.original_filename}, status={self.status})>"
+
+class UploadKey(Base):
+    __tablename__ = "upload_keys"
+    
+    # "idempotency:<client key>" or "content:<sha256>"
+    key = Column(String(320), primary_key=True)
+    file_id = Column(String(36), nullable=False, index=True)
+    content_hash = Column(String(64), nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    expires_at = Column(DateTime, nullable=False, index=True)
+    
+    def __repr__(self):
+        return f"<UploadKey(key={self.key}, file_id={self.file_id}, expires_at={self.expires_at})>"
+
+class EnhancementClaim(Base):
+    __tablename__ = "enhancement_claims"
+    
+    # One row per file an inference worker has started; gone once the run finishes
+    file_id = Column(String(36), primary_key=True)
+    owner = Column(String(255), nullable=False, index=True)  # "<host>:<pid>" of the inference worker
+    attempts = Column(Integer, nullable=False, default=1)
+    claimed_at = Column(DateTime, default=datetime.utcnow)
+    heartbeat_at = Column(DateTime, nullable=False, index=True)
+    
+    def __repr__(self):
+        return f"<EnhancementClaim(file_id={self.file_id}, owner={self.owner}, attempts={self.attempts})>"
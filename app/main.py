@@ -1,9 +1,10 @@
 from fastapi import FastAPI, Request
 from fastapi.templating import Jinja2Templates
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, JSONResponse
 from .api.routes import router as api_router
 from .database.database import init_db
+from .services.inference_worker import inference_worker
 import logging
 import os
 import sys
@@ -73,26 +74,24 @@ async def home(request: Request):
 @app.get("/health")
 async def health_check():
     """Health check endpoint for Hugging Face Spaces"""
-    try:
-        # Try to import and check if model can be loaded
-        from .services.audio_service import AudioEnhancementService
-        service = AudioEnhancementService()
-        model_status = "loaded" if hasattr(service, '_model') and service._model else "loading"
-    except Exception as e:
-        model_status = f"error: {str(e)}"
+    # The model lives in the inference worker, so this never loads the ML stack here
+    worker_status = inference_worker.status()
+    healthy = inference_worker.is_healthy()
     
-    return {
-        "status": "healthy",
+    return JSONResponse(status_code=200 if healthy else 503, content={
+        "status": "healthy" if healthy else "unhealthy",
         "platform": "Hugging Face Spaces",
-        "model_status": model_status,
+        "model_status": worker_status["model_status"],
+        "parallelism": worker_status["parallelism"],
         "database": "connected",
         "port": "7860"
-    }
+    })
 
 @app.on_event("startup")
 async def startup_event():
     """Initialize services on startup"""
     logging.info("🚀 NoiseNix starting up on Hugging Face Spaces...")
+    inference_worker.start()
     logging.info("📊 Database initialized")
     logging.info("🤗 Optimized for Hugging Face Spaces")
     logging.info("🎵 Ready to enhance audio files!")
@@ -101,6 +100,7 @@ async def startup_event():
 async def shutdown_event():
     """Cleanup on shutdown"""
     logging.info("👋 NoiseNix shutting down...")
+    inference_worker.stop()
 
 # Add CORS middleware for Hugging Face Spaces
 from fastapi.middleware.cors import CORSMiddleware
@@ -1,15 +1,18 @@
+import asyncio
 import io
 import torch
 import torchaudio
 from speechbrain.inference import SpectralMaskEnhancement
 from typing import Tuple, Optional
 from sqlalchemy.orm import Session
-from ..database.models import AudioFile
-from datetime import datetime
+from .database_service import AudioDatabaseService
+from .wav_decoder import decode_wav_bytes, decode_wav_file
+from .parallelism import BENCHMARK_CLIP_SECONDS, ParallelismConfig, configure_inter_op_threads, tune_parallelism
 import logging
 import os
 import tempfile
 import gc
+from concurrent.futures import ThreadPoolExecutor
 
 # Set up logging
 logger = logging.getLogger(__name__)
@@ -17,6 +20,8 @@ logger = logging.getLogger(__name__)
 class AudioEnhancementService:
     _instance = None
     _model = None
+    parallelism: Optional[ParallelismConfig] = None
+    job_pool: Optional[ThreadPoolExecutor] = None
     
     def __new__(cls):
         """Singleton pattern to load model only once"""
@@ -35,8 +40,8 @@ class AudioEnhancementService:
             os.makedirs(cache_dir, exist_ok=True)
             os.environ['SPEECHBRAIN_CACHE'] = cache_dir
             
-            # Set torch settings for better memory usage
-            torch.set_num_threads(2)  # Limit threads for HF Spaces
+            # Inter-op threads can only be set before torch starts any parallel work
+            inter_op_threads = configure_inter_op_threads()
             
             self._model = SpectralMaskEnhancement.from_hparams(
                 source="speechbrain/metricgan-plus-voicebank",
@@ -45,13 +50,39 @@ class AudioEnhancementService:
             
             logger.info("✅ MetricGAN+ model loaded successfully on HF Spaces!")
             
+            # Size torch threads and concurrent jobs for this host
+            self.parallelism = tune_parallelism(self._benchmark_workload(), inter_op_threads)
+            self.job_pool = ThreadPoolExecutor(
+                max_workers=self.parallelism.workers,
+                thread_name_prefix="enhance"
+            )
+            
         except Exception as e:
             logger.error(f"❌ Failed to load MetricGAN+ model: {str(e)}")
             raise RuntimeError(f"Model initialization failed: {str(e)}")
     
+    def _benchmark_workload(self):
+        """Synthetic upload through the production enhancement path, used by the parallelism autotuner"""
+        # 16-bit stereo at 44.1kHz like a typical upload, so decoding, resampling and temp-file I/O are timed too
+        sample_rate = 44100
+        noisy = (torch.randn(2, sample_rate * BENCHMARK_CLIP_SECONDS) * 0.1).clamp(-1.0, 1.0)
+        buffer = io.BytesIO()
+        torchaudio.save(buffer, noisy, sample_rate, format="wav", encoding="PCM_S", bits_per_sample=16)
+        clip_bytes = buffer.getvalue()
+        
+        def workload():
+            self.enhance_from_bytes(clip_bytes)
+        
+        return workload
+    
     def bytes_to_tensor(self, audio_bytes: bytes) -> Tuple[torch.Tensor, int]:
         """Convert audio bytes to tensor"""
         try:
+            # PCM WAV is decoded straight from the upload buffer
+            decoded = decode_wav_bytes(audio_bytes)
+            if decoded is not None:
+                return decoded
+            
             audio_buffer = io.BytesIO(audio_bytes)
             waveform, sample_rate = torchaudio.load(audio_buffer)
             return waveform, sample_rate
@@ -117,7 +148,7 @@ class AudioEnhancementService:
                 
                 # Load enhanced audio
                 if os.path.exists(temp_output_path):
-                    enhanced_waveform, _ = torchaudio.load(temp_output_path)
+                    enhanced_waveform, _ = decode_wav_file(temp_output_path) or torchaudio.load(temp_output_path)
                     logger.info(f"✅ Enhanced shape: {enhanced_waveform.shape}")
                 else:
                     if enhanced_waveform is None:
@@ -153,74 +184,16 @@ class AudioEnhancementService:
                 torch.cuda.empty_cache()
             raise RuntimeError(f"Enhancement failed: {str(e)}")
 
-# Keep the AudioDatabaseService and process_audio_enhancement functions as they are
-class AudioDatabaseService:
-    """Service for database operations"""
-    
-    @staticmethod
-    def create_audio_file(db: Session, filename: str, audio_bytes: bytes) -> AudioFile:
-        """Store uploaded audio file in database"""
-        try:
-            audio_file = AudioFile(
-                original_filename=filename,
-                original_audio=audio_bytes,
-                file_size=len(audio_bytes),
-                status="uploaded"
-            )
-            db.add(audio_file)
-            db.commit()
-            db.refresh(audio_file)
-            logger.info(f"💾 Audio file stored: {filename} ({len(audio_bytes)} bytes)")
-            return audio_file
-        except Exception as e:
-            db.rollback()
-            logger.error(f"❌ Failed to store audio file: {str(e)}")
-            raise
-    
-    @staticmethod
-    def get_audio_file(db: Session, file_id: str) -> Optional[AudioFile]:
-        """Retrieve audio file by ID"""
-        try:
-            return db.query(AudioFile).filter(AudioFile.id == file_id).first()
-        except Exception as e:
-            logger.error(f"❌ Failed to retrieve audio file {file_id}: {str(e)}")
-            return None
-    
-    @staticmethod
-    def update_audio_status(db: Session, file_id: str, status: str, error_message: str = None):
-        """Update audio file status"""
-        try:
-            audio_file = db.query(AudioFile).filter(AudioFile.id == file_id).first()
-            if audio_file:
-                audio_file.status = status
-                audio_file.error_message = error_message
-                if status == "enhanced":
-                    audio_file.processed_at = datetime.utcnow()
-                db.commit()
-                logger.info(f"✅ Updated {file_id} status to {status}")
-        except Exception as e:
-            db.rollback()
-            logger.error(f"❌ Failed to update status for {file_id}: {str(e)}")
-    
-    @staticmethod
-    def store_enhanced_audio(db: Session, file_id: str, enhanced_bytes: bytes):
-        """Store enhanced audio bytes"""
-        try:
-            audio_file = db.query(AudioFile).filter(AudioFile.id == file_id).first()
-            if audio_file:
-                audio_file.enhanced_audio = enhanced_bytes
-                audio_file.status = "enhanced"
-                audio_file.processed_at = datetime.utcnow()
-                db.commit()
-                logger.info(f"💾 Enhanced audio stored for {file_id}")
-        except Exception as e:
-            db.rollback()
-            logger.error(f"❌ Failed to store enhanced audio for {file_id}: {str(e)}")
-            raise
-
 async def process_audio_enhancement(db: Session, file_id: str):
     """Process audio enhancement asynchronously"""
     enhancement_service = AudioEnhancementService()
+    loop = asyncio.get_running_loop()
+    # Jobs wait in the pool's queue, not on a thread, until one of the tuned workers is free
+    return await loop.run_in_executor(enhancement_service.job_pool, run_audio_enhancement, db, file_id)
+
+def run_audio_enhancement(db: Session, file_id: str) -> bool:
+    """Enhance one stored file; runs on a job pool thread, so "processing" means actually started"""
+    enhancement_service = AudioEnhancementService()
     db_service = AudioDatabaseService()
     
     try:
@@ -0,0 +1,298 @@
+from sqlalchemy.orm import Session
+from sqlalchemy.exc import IntegrityError
+from typing import List, Optional, Tuple
+from ..database.models import AudioFile, EnhancementClaim, UploadKey
+from datetime import datetime, timedelta
+import logging
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+class AudioDatabaseService:
+    """Service for database operations"""
+    
+    @staticmethod
+    def create_audio_file(db: Session, filename: str, audio_bytes: bytes) -> AudioFile:
+        """Store uploaded audio file in database"""
+        try:
+            audio_file = AudioFile(
+                original_filename=filename,
+                original_audio=audio_bytes,
+                file_size=len(audio_bytes),
+                status="uploaded"
+            )
+            db.add(audio_file)
+            db.commit()
+            db.refresh(audio_file)
+            logger.info(f"💾 Audio file stored: {filename} ({len(audio_bytes)} bytes)")
+            return audio_file
+        except Exception as e:
+            db.rollback()
+            logger.error(f"❌ Failed to store audio file: {str(e)}")
+            raise
+    
+    @staticmethod
+    def get_audio_file(db: Session, file_id: str) -> Optional[AudioFile]:
+        """Retrieve audio file by ID"""
+        try:
+            return db.query(AudioFile).filter(AudioFile.id == file_id).first()
+        except Exception as e:
+            logger.error(f"❌ Failed to retrieve audio file {file_id}: {str(e)}")
+            return None
+    
+    @staticmethod
+    def delete_audio_file(db: Session, file_id: str) -> bool:
+        """Delete an audio file together with the upload keys pointing at it"""
+        try:
+            deleted = db.query(AudioFile).filter(AudioFile.id == file_id).delete(synchronize_session=False)
+            db.query(UploadKey).filter(UploadKey.file_id == file_id).delete(synchronize_session=False)
+            db.query(EnhancementClaim).filter(EnhancementClaim.file_id == file_id).delete(synchronize_session=False)
+            db.commit()
+            return deleted > 0
+        except Exception as e:
+            db.rollback()
+            logger.error(f"❌ Failed to delete audio file {file_id}: {str(e)}")
+            raise
+    
+    @staticmethod
+    def find_duplicate_upload(db: Session, idempotency_key: Optional[str], content_hash: str,
+                              key_ttl: int) -> Optional[AudioFile]:
+        """Return the file an earlier upload with the same key or content already created"""
+        now = datetime.utcnow()
+        try:
+            db.query(UploadKey).filter(UploadKey.expires_at < now).delete(synchronize_session=False)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.warning(f"⚠️ Failed to purge expired upload keys: {str(e)}")
+        
+        if idempotency_key:
+            entry = db.query(UploadKey).filter(UploadKey.key == f"idempotency:{idempotency_key}").first()
+            if entry:
+                if entry.content_hash != content_hash:
+                    raise ValueError("Idempotency-Key was already used for a different file")
+                audio_file = AudioDatabaseService.get_audio_file(db, entry.file_id)
+                if audio_file:
+                    return audio_file
+                # The file was deleted, so the key is free again
+                db.delete(entry)
+                db.commit()
+        
+        entry = db.query(UploadKey).filter(UploadKey.key == f"content:{content_hash}").first()
+        if entry:
+            audio_file = AudioDatabaseService.get_audio_file(db, entry.file_id)
+            # A failed run should not block a fresh attempt with the same content
+            if audio_file and audio_file.status != "error":
+                if idempotency_key:
+                    # Retries with this new key must keep finding the file after the content window
+                    owner_id, owner_hash = AudioDatabaseService.claim_upload_key(
+                        db, f"idempotency:{idempotency_key}", audio_file.id, content_hash, key_ttl
+                    )
+                    if owner_hash != content_hash:
+                        raise ValueError("Idempotency-Key was already used for a different file")
+                    if owner_id != audio_file.id:
+                        # A concurrent request with the same key got there first
+                        return AudioDatabaseService.get_audio_file(db, owner_id) or audio_file
+                return audio_file
+        
+        return None
+    
+    @staticmethod
+    def claim_upload_key(db: Session, key: str, file_id: str, content_hash: str, ttl: int,
+                         replace_errored: bool = False) -> Tuple[str, str]:
+        """Insert an upload key for file_id, returning the (file id, content hash) that owns it"""
+        for _ in range(3):
+            now = datetime.utcnow()
+            try:
+                db.add(UploadKey(
+                    key=key,
+                    file_id=file_id,
+                    content_hash=content_hash,
+                    expires_at=now + timedelta(seconds=ttl)
+                ))
+                db.commit()
+                return file_id, content_hash
+            except IntegrityError:
+                # Another request already holds the key
+                db.rollback()
+            
+            entry = db.query(UploadKey).filter(UploadKey.key == key).first()
+            if entry is None:
+                continue  # purged in the meantime, try the insert again
+            
+            owner = AudioDatabaseService.get_audio_file(db, entry.file_id)
+            reclaimable = (
+                owner is None
+                or entry.expires_at < now
+                or (replace_errored and owner.status == "error")
+            )
+            if not reclaimable:
+                return entry.file_id, entry.content_hash
+            
+            # Only take over the row if nobody else did since we read it
+            updated = db.query(UploadKey).filter(
+                UploadKey.key == key, UploadKey.file_id == entry.file_id
+            ).update({
+                "file_id": file_id,
+                "content_hash": content_hash,
+                "created_at": now,
+                "expires_at": now + timedelta(seconds=ttl)
+            }, synchronize_session=False)
+            db.commit()
+            if updated:
+                return file_id, content_hash
+        
+        raise RuntimeError(f"Could not claim upload key {key}")
+    
+    @staticmethod
+    def register_upload_keys(db: Session, file_id: str, idempotency_key: Optional[str], content_hash: str,
+                             key_ttl: int, content_window: int) -> str:
+        """Record the keys for a new upload, returning the file id the upload should attach to"""
+        if idempotency_key:
+            key = f"idempotency:{idempotency_key}"
+            owner_id, owner_hash = AudioDatabaseService.claim_upload_key(db, key, file_id, content_hash, key_ttl)
+            if owner_hash != content_hash:
+                raise ValueError("Idempotency-Key was already used for a different file")
+            if owner_id != file_id:
+                return owner_id
+        
+        # Identical content uploaded concurrently coalesces onto one file; a failed run can be retried
+        owner_id, _ = AudioDatabaseService.claim_upload_key(
+            db, f"content:{content_hash}", file_id, content_hash, content_window, replace_errored=True
+        )
+        if owner_id != file_id and idempotency_key:
+            # Retries with our key must find the file we attached to, not the one being dropped
+            db.query(UploadKey).filter(
+                UploadKey.key == f"idempotency:{idempotency_key}", UploadKey.file_id == file_id
+            ).update({"file_id": owner_id}, synchronize_session=False)
+            db.commit()
+        
+        return owner_id
+    
+    @staticmethod
+    def update_audio_status(db: Session, file_id: str, status: str, error_message: str = None):
+        """Update audio file status"""
+        try:
+            audio_file = db.query(AudioFile).filter(AudioFile.id == file_id).first()
+            if audio_file:
+                audio_file.status = status
+                audio_file.error_message = error_message
+                if status == "enhanced":
+                    audio_file.processed_at = datetime.utcnow()
+                db.commit()
+                logger.info(f"✅ Updated {file_id} status to {status}")
+        except Exception as e:
+            db.rollback()
+            logger.error(f"❌ Failed to update status for {file_id}: {str(e)}")
+    
+    @staticmethod
+    def store_enhanced_audio(db: Session, file_id: str, enhanced_bytes: bytes):
+        """Store enhanced audio bytes"""
+        try:
+            audio_file = db.query(AudioFile).filter(AudioFile.id == file_id).first()
+            if audio_file:
+                audio_file.enhanced_audio = enhanced_bytes
+                audio_file.status = "enhanced"
+                audio_file.processed_at = datetime.utcnow()
+                db.commit()
+                logger.info(f"💾 Enhanced audio stored for {file_id}")
+        except Exception as e:
+            db.rollback()
+            logger.error(f"❌ Failed to store enhanced audio for {file_id}: {str(e)}")
+            raise
+    
+    @staticmethod
+    def claim_enhancement(db: Session, file_id: str, owner: str, stale_after: int, max_attempts: int) -> bool:
+        """Claim a file for enhancement by owner; False if a live worker has it or it ran out of attempts"""
+        for _ in range(3):
+            now = datetime.utcnow()
+            claim = db.query(EnhancementClaim).filter(EnhancementClaim.file_id == file_id).first()
+            if claim is None:
+                try:
+                    db.add(EnhancementClaim(file_id=file_id, owner=owner, attempts=1, heartbeat_at=now))
+                    db.commit()
+                    return True
+                except IntegrityError:
+                    db.rollback()
+                    continue  # another worker claimed it first, look at its claim
+            
+            if claim.heartbeat_at >= now - timedelta(seconds=stale_after):
+                return False  # a live worker is enhancing it
+            
+            # The previous owner died mid-run; only one taker may move the claim on
+            previous_owner, deaths = claim.owner, claim.attempts
+            attempts = deaths + 1
+            updated = db.query(EnhancementClaim).filter(
+                EnhancementClaim.file_id == file_id,
+                EnhancementClaim.owner == previous_owner,
+                EnhancementClaim.heartbeat_at == claim.heartbeat_at
+            ).update({
+                "owner": owner,
+                "attempts": attempts,
+                "claimed_at": now,
+                "heartbeat_at": now
+            }, synchronize_session=False)
+            db.commit()
+            if not updated:
+                continue
+            
+            if attempts > max_attempts:
+                logger.warning(f"⚠️ {file_id} was in progress during {deaths} worker deaths, giving up")
+                AudioDatabaseService.update_audio_status(
+                    db, file_id, "error", "Inference worker stopped while enhancing this file"
+                )
+                AudioDatabaseService.release_enhancement(db, file_id, owner)
+                return False
+            return True
+        
+        return False
+    
+    @staticmethod
+    def release_enhancement(db: Session, file_id: str, owner: str):
+        """Drop owner's claim on a file once its run is over"""
+        try:
+            db.query(EnhancementClaim).filter(
+                EnhancementClaim.file_id == file_id, EnhancementClaim.owner == owner
+            ).delete(synchronize_session=False)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.error(f"❌ Failed to release claim on {file_id}: {str(e)}")
+    
+    @staticmethod
+    def heartbeat_enhancements(db: Session, owner: str):
+        """Mark all of owner's claims as still alive"""
+        try:
+            db.query(EnhancementClaim).filter(EnhancementClaim.owner == owner).update(
+                {"heartbeat_at": datetime.utcnow()}, synchronize_session=False
+            )
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.warning(f"⚠️ Heartbeat failed for {owner}: {str(e)}")
+    
+    @staticmethod
+    def expire_enhancement_claims(db: Session, owner: str):
+        """Make a dead owner's claims immediately reclaimable"""
+        try:
+            db.query(EnhancementClaim).filter(EnhancementClaim.owner == owner).update(
+                {"heartbeat_at": datetime(1970, 1, 1)}, synchronize_session=False
+            )
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.error(f"❌ Failed to expire claims of {owner}: {str(e)}")
+    
+    @staticmethod
+    def pending_file_ids(db: Session, stale_after: int) -> List[str]:
+        """Unfinished files that no live worker has claimed, oldest first"""
+        cutoff = datetime.utcnow() - timedelta(seconds=stale_after)
+        live_claim = db.query(EnhancementClaim.file_id).filter(
+            EnhancementClaim.file_id == AudioFile.id,
+            EnhancementClaim.heartbeat_at >= cutoff
+        ).exists()
+        rows = db.query(AudioFile.id).filter(
+            AudioFile.status.in_(("uploaded", "processing")),
+            ~live_claim
+        ).order_by(AudioFile.created_at).all()
+        return [file_id for file_id, in rows]
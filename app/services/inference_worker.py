@@ -0,0 +1,262 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import socket
+import sys
+import threading
+import time
+from typing import Dict, List, Optional
+from ..database.database import SessionLocal
+from .database_service import AudioDatabaseService
+
+# Nothing here may import torch, torchaudio or speechbrain at module level: this module is
+# loaded by the API process, and the ML stack must only ever load in the worker process.
+
+logger = logging.getLogger(__name__)
+
+# Seconds to wait for in-flight jobs on shutdown before the worker is terminated
+SHUTDOWN_TIMEOUT = 30
+# Worker deaths a file may be in progress for before it is marked as failed
+MAX_JOB_ATTEMPTS = 2
+# A worker refreshes its claims every HEARTBEAT_INTERVAL; claims older than CLAIM_TIMEOUT belong to a dead one
+HEARTBEAT_INTERVAL = int(os.getenv("INFERENCE_HEARTBEAT_SECONDS", 10))
+CLAIM_TIMEOUT = int(os.getenv("INFERENCE_CLAIM_TIMEOUT_SECONDS", 60))
+# How often the supervisor checks the worker is alive, and requeues files nobody has claimed
+SUPERVISE_INTERVAL = 5
+RECOVERY_INTERVAL = 60
+
+def _owner_id(pid: int) -> str:
+    """Claim owner for a worker process, unique across hosts sharing the database"""
+    return f"{socket.gethostname()}:{pid}"
+
+def _worker_main(jobs, events):
+    """Entry point of the inference process: load the model, then enhance file ids from the pipe"""
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        handlers=[logging.StreamHandler(sys.stdout)]
+    )
+
+    db_service = AudioDatabaseService()
+    owner = _owner_id(os.getpid())
+    try:
+        from .audio_service import AudioEnhancementService, run_audio_enhancement
+
+        service = AudioEnhancementService()
+        events.send({
+            "model_status": "loaded",
+            "parallelism": service.parallelism.as_dict() if service.parallelism else None
+        })
+        load_error = None
+        job_pool = service.job_pool
+    except Exception as e:
+        logger.error(f"❌ Inference worker could not load the model: {str(e)}")
+        events.send({"model_status": f"error: {str(e)}", "parallelism": None})
+        load_error = str(e)
+        job_pool = None
+
+    def heartbeat():
+        while True:
+            time.sleep(HEARTBEAT_INTERVAL)
+            db = SessionLocal()
+            try:
+                db_service.heartbeat_enhancements(db, owner)
+            finally:
+                db.close()
+
+    threading.Thread(target=heartbeat, daemon=True).start()
+
+    def run_claimed(file_id: str):
+        """Claim the file, then enhance it; runs on a job pool thread so only started files hold a claim"""
+        db = SessionLocal()
+        try:
+            if not db_service.claim_enhancement(db, file_id, owner, CLAIM_TIMEOUT, MAX_JOB_ATTEMPTS):
+                return
+            try:
+                audio_file = db_service.get_audio_file(db, file_id)
+                if audio_file is None or audio_file.status in ("enhanced", "error"):
+                    return
+                if load_error is not None:
+                    # Stay up and fail jobs fast rather than reloading the model for each one
+                    db_service.update_audio_status(db, file_id, "error", f"Model unavailable: {load_error}")
+                    return
+                run_audio_enhancement(db, file_id)
+            finally:
+                db_service.release_enhancement(db, file_id, owner)
+        finally:
+            db.close()
+
+    # The same file can be queued more than once after a restart or recovery pass
+    active = set()
+
+    async def run_job(file_id: str):
+        try:
+            # Jobs wait in the pool's queue, unclaimed, until one of the tuned workers is free
+            await asyncio.get_running_loop().run_in_executor(job_pool, run_claimed, file_id)
+        except Exception as e:
+            logger.error(f"❌ Job for {file_id} failed: {str(e)}")
+        finally:
+            active.discard(file_id)
+
+    async def serve():
+        loop = asyncio.get_running_loop()
+        running = set()
+        while True:
+            try:
+                file_id = await loop.run_in_executor(None, jobs.recv)
+            except EOFError:
+                break
+            if file_id is None:
+                break
+            if file_id in active:
+                continue
+            active.add(file_id)
+            task = asyncio.create_task(run_job(file_id))
+            running.add(task)
+            task.add_done_callback(running.discard)
+        if running:
+            await asyncio.gather(*running, return_exceptions=True)
+
+    asyncio.run(serve())
+
+class InferenceWorker:
+    """Runs enhancement jobs in a separate process so the API process never loads the ML stack"""
+
+    def __init__(self):
+        self._ctx = multiprocessing.get_context("spawn")
+        self._lock = threading.RLock()
+        self._process = None
+        # One pair of pipes for the lifetime of the app, handed to each worker process in turn
+        self._jobs_reader, self._jobs_writer = self._ctx.Pipe(duplex=False)
+        self._events_reader, self._events_writer = self._ctx.Pipe(duplex=False)
+        self._event_thread = None
+        self._supervisor = None
+        self._stopping = threading.Event()
+        self._last_recovery = 0.0
+        self._status = {"model_status": "not started", "parallelism": None}
+
+    def start(self):
+        """Start the worker process if it is not already running, then requeue unfinished files"""
+        with self._lock:
+            self._stopping.clear()
+            self._ensure_running()
+
+    def _ensure_running(self):
+        with self._lock:
+            if self._process is not None and self._process.is_alive():
+                return
+            if self._process is not None:
+                logger.warning(f"⚠️ Inference worker exited with code {self._process.exitcode}, restarting")
+                # Its claims go stale now rather than after CLAIM_TIMEOUT, so its files are retried right away
+                db = SessionLocal()
+                try:
+                    AudioDatabaseService.expire_enhancement_claims(db, _owner_id(self._process.pid))
+                finally:
+                    db.close()
+
+            # Whatever the last worker left unread is requeued from the database below
+            while self._jobs_reader.poll():
+                self._jobs_reader.recv()
+
+            if self._event_thread is None or not self._event_thread.is_alive():
+                self._event_thread = threading.Thread(target=self._read_events, daemon=True)
+                self._event_thread.start()
+            if self._supervisor is None or not self._supervisor.is_alive():
+                self._supervisor = threading.Thread(target=self._supervise, daemon=True)
+                self._supervisor.start()
+
+            self._status = {"model_status": "loading", "parallelism": None}
+            self._process = self._ctx.Process(
+                target=_worker_main,
+                args=(self._jobs_reader, self._events_writer),
+                name="noisenix-inference",
+                daemon=True
+            )
+            self._process.start()
+            logger.info(f"🧠 Inference worker started (pid {self._process.pid})")
+            self._requeue_pending()
+
+    def _requeue_pending(self):
+        """Queue unfinished files that no live worker has claimed"""
+        self._last_recovery = time.monotonic()
+        for file_id in self._recover_pending():
+            self._jobs_writer.send(file_id)
+
+    def _recover_pending(self) -> List[str]:
+        """File ids left unfinished or unclaimed; attempts are counted by whoever claims them next"""
+        db = SessionLocal()
+        try:
+            pending = AudioDatabaseService.pending_file_ids(db, CLAIM_TIMEOUT)
+            if pending:
+                logger.info(f"🔁 Requeueing {len(pending)} unfinished file(s)")
+            return pending
+        except Exception as e:
+            logger.error(f"❌ Failed to recover unfinished files: {str(e)}")
+            return []
+        finally:
+            db.close()
+
+    def _supervise(self):
+        """Restart the worker when it dies and periodically pick up files nobody is working on"""
+        while not self._stopping.wait(SUPERVISE_INTERVAL):
+            try:
+                with self._lock:
+                    if self._stopping.is_set():
+                        return
+                    if self._process is None or not self._process.is_alive():
+                        self._ensure_running()
+                    elif time.monotonic() - self._last_recovery >= RECOVERY_INTERVAL:
+                        self._requeue_pending()
+            except Exception as e:
+                logger.error(f"❌ Inference worker supervisor failed: {str(e)}")
+
+    def _read_events(self):
+        """Keep the latest status reported by the worker for /health"""
+        while True:
+            try:
+                event = self._events_reader.recv()
+            except (EOFError, OSError):
+                return
+            if event is None:
+                return
+            self._status = event
+
+    def submit(self, file_id: str):
+        """Queue a file for enhancement, restarting the worker if it died"""
+        with self._lock:
+            self.start()
+            self._jobs_writer.send(file_id)
+
+    def status(self) -> Dict[str, Optional[object]]:
+        """Model and parallelism status of the worker"""
+        status = dict(self._status)
+        if self._process is not None and not self._process.is_alive() and not status["model_status"].startswith("error"):
+            status["model_status"] = f"stopped (exit code {self._process.exitcode})"
+        return status
+
+    def is_healthy(self) -> bool:
+        """Whether the worker is running and its model either loaded or is still loading"""
+        model_status = self.status()["model_status"]
+        return not (model_status.startswith("error") or model_status.startswith("stopped")
+                    or model_status == "not started")
+
+    def stop(self):
+        """Let queued jobs finish, then stop the worker process"""
+        self._stopping.set()
+        with self._lock:
+            if self._process is None:
+                return
+            if self._process.is_alive():
+                self._jobs_writer.send(None)
+                self._process.join(SHUTDOWN_TIMEOUT)
+                if self._process.is_alive():
+                    logger.warning("⚠️ Inference worker did not stop in time, terminating")
+                    self._process.terminate()
+                    self._process.join()
+            # Wake the event reader so it exits too
+            self._events_writer.send(None)
+            self._process = None
+            self._status = {"model_status": "stopped", "parallelism": None}
+
+inference_worker = InferenceWorker()
@@ -0,0 +1,233 @@
+import math
+import os
+import threading
+import time
+import torch
+from typing import Callable, Dict, List, NamedTuple, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Environment configuration, any explicit value overrides the autotuner
+MODE_ENV = "PARALLELISM_MODE"  # throughput or latency
+AUTOTUNE_ENV = "PARALLELISM_AUTOTUNE"
+INTRA_OP_ENV = "TORCH_NUM_THREADS"
+INTER_OP_ENV = "TORCH_NUM_INTEROP_THREADS"
+WORKERS_ENV = "ENHANCEMENT_WORKERS"
+
+VALID_MODES = ("throughput", "latency")
+BENCHMARK_REPEATS = 2
+# Long enough that per-call overhead doesn't hide the effect of more intra-op threads
+BENCHMARK_CLIP_SECONDS = int(os.getenv("PARALLELISM_BENCHMARK_SECONDS", 15))
+# Peak memory of one enhancement job on a maximum size (50MB) upload
+JOB_MEMORY_MB = int(os.getenv("ENHANCEMENT_JOB_MEMORY_MB", 1024))
+
+class ParallelismConfig(NamedTuple):
+    intra_op_threads: int
+    inter_op_threads: int
+    workers: int
+    mode: str
+    source: str  # override, autotuned or default
+    available_cpus: int
+    cpu_budget: int
+    score: Optional[float] = None  # clips/s in throughput mode, seconds per clip in latency mode
+    memory_worker_cap: Optional[int] = None  # most concurrent jobs that fit in free memory, None if unknown
+
+    def as_dict(self) -> Dict:
+        return self._asdict()
+
+def _read_cgroup_cpu_limit() -> Optional[float]:
+    """CPU quota from cgroup v2 or v1, None when unlimited"""
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()[:2]
+        if quota != "max":
+            return int(quota) / int(period)
+        return None
+    except (OSError, ValueError):
+        pass
+    try:
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_quota_us") as f:
+            quota = int(f.read())
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_period_us") as f:
+            period = int(f.read())
+        if quota > 0 and period > 0:
+            return quota / period
+    except (OSError, ValueError):
+        pass
+    return None
+
+def detect_available_cpus() -> int:
+    """CPUs this process may actually use: affinity mask capped by the cgroup quota"""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+
+    quota = _read_cgroup_cpu_limit()
+    if quota is not None:
+        cpus = min(cpus, max(1, math.ceil(quota)))
+    return max(1, cpus)
+
+def _read_first_line(path: str) -> Optional[str]:
+    try:
+        with open(path) as f:
+            return f.readline().strip()
+    except OSError:
+        return None
+
+def detect_available_memory() -> Optional[int]:
+    """Bytes this process can still allocate: free host memory capped by the cgroup headroom"""
+    available = None
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    available = int(line.split()[1]) * 1024
+                    break
+    except (OSError, ValueError):
+        pass
+
+    # cgroup v2, then v1; v1 reports a huge number when unlimited
+    for limit_path, usage_path in (
+        ("/sys/fs/cgroup/memory.max", "/sys/fs/cgroup/memory.current"),
+        ("/sys/fs/cgroup/memory/memory.limit_in_bytes", "/sys/fs/cgroup/memory/memory.usage_in_bytes"),
+    ):
+        limit, usage = _read_first_line(limit_path), _read_first_line(usage_path)
+        if limit is None or usage is None:
+            continue
+        try:
+            headroom = int(limit) - int(usage)
+        except ValueError:
+            break  # "max", no limit
+        if int(limit) < 1 << 60:
+            available = headroom if available is None else min(available, headroom)
+        break
+
+    return max(0, available) if available is not None else None
+
+def _env_int(name: str) -> Optional[int]:
+    value = os.getenv(name)
+    if not value:
+        return None
+    try:
+        return max(1, int(value))
+    except ValueError:
+        logger.warning(f"⚠️ Ignoring invalid {name}={value!r}")
+        return None
+
+def _steps(limit: int) -> List[int]:
+    """1, powers of two and the limit itself"""
+    return sorted({1, limit} | {2 ** i for i in range(1, limit.bit_length()) if 2 ** i <= limit})
+
+def _candidates(budget: int, mode: str, max_workers: int,
+                intra_fixed: Optional[int] = None, workers_fixed: Optional[int] = None) -> List[tuple]:
+    """(intra-op threads, workers) pairs that fit in the CPU and memory budget"""
+    if intra_fixed:
+        if mode == "latency":
+            return [(intra_fixed, 1)]
+        return [(intra_fixed, w) for w in _steps(max(1, min(max_workers, budget // intra_fixed)))]
+    if workers_fixed:
+        if mode == "latency":
+            return [(t, 1) for t in _steps(budget)]
+        return [(t, workers_fixed) for t in _steps(max(1, budget // workers_fixed))]
+
+    threads = _steps(budget)
+    if mode == "latency":
+        return [(t, 1) for t in threads]
+    # Throughput only considers settings that keep at least half the budget busy
+    return [(t, w) for t in threads for w in threads if w <= max_workers and budget // 2 < t * w <= budget]
+
+def _measure(workload: Callable[[], None], workers: int) -> float:
+    """Wall time for `workers` threads to run BENCHMARK_REPEATS workloads each"""
+    def run():
+        for _ in range(BENCHMARK_REPEATS):
+            workload()
+
+    threads = [threading.Thread(target=run) for _ in range(workers)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - start
+
+def configure_inter_op_threads() -> int:
+    """Set torch inter-op threads; torch only allows this once, before any parallel work"""
+    inter_op = _env_int(INTER_OP_ENV) or 1
+    try:
+        torch.set_num_interop_threads(inter_op)
+    except RuntimeError:
+        inter_op = torch.get_num_interop_threads()
+        logger.warning(f"⚠️ Inter-op threads already fixed at {inter_op}")
+    return inter_op
+
+def tune_parallelism(workload: Optional[Callable[[], None]] = None, inter_op: int = 1) -> ParallelismConfig:
+    """Pick intra-op threads and worker count from env overrides or a short benchmark"""
+    mode = os.getenv(MODE_ENV, "throughput").lower()
+    if mode not in VALID_MODES:
+        logger.warning(f"⚠️ Unknown {MODE_ENV}={mode!r}, using throughput")
+        mode = "throughput"
+
+    available = detect_available_cpus()
+    # Leave room for the other uvicorn workers on this host
+    web_workers = _env_int("WEB_CONCURRENCY") or 1
+    budget = max(1, available // web_workers)
+
+    memory = detect_available_memory()
+    memory_cap = max(1, memory // (web_workers * JOB_MEMORY_MB * 1024 * 1024)) if memory is not None else None
+    max_workers = memory_cap or budget
+
+    intra_override = _env_int(INTRA_OP_ENV)
+    workers_override = _env_int(WORKERS_ENV)
+    autotune = os.getenv(AUTOTUNE_ENV, "true").lower() == "true"
+
+    if workers_override and memory_cap and workers_override > memory_cap:
+        logger.warning(f"⚠️ {WORKERS_ENV}={workers_override} exceeds the {memory_cap} jobs that fit in free memory")
+
+    if intra_override and workers_override:
+        config = ParallelismConfig(intra_override, inter_op, workers_override, mode, "override", available, budget)
+    elif not autotune or workload is None:
+        intra = intra_override or max(1, budget // (workers_override or 1))
+        workers = workers_override or (1 if mode == "latency" else min(max_workers, max(1, budget // intra)))
+        config = ParallelismConfig(intra, inter_op, workers, mode, "default", available, budget)
+    else:
+        candidates = _candidates(budget, mode, max_workers, intra_override, workers_override)
+
+        best = None
+        for intra, workers in candidates:
+            torch.set_num_threads(intra)
+            try:
+                workload()  # warm up allocator and kernels for this thread count
+                elapsed = _measure(workload, workers)
+            except Exception as e:
+                logger.warning(f"⚠️ Benchmark failed for {intra} threads x {workers} workers: {str(e)}")
+                continue
+
+            clips = workers * BENCHMARK_REPEATS
+            score = clips / elapsed if mode == "throughput" else elapsed / BENCHMARK_REPEATS
+            logger.info(f"⏱️ {intra} threads x {workers} workers: {score:.3f} {'clips/s' if mode == 'throughput' else 's/clip'}")
+
+            better = best is None or (score > best[2] if mode == "throughput" else score < best[2])
+            if better:
+                best = (intra, workers, score)
+
+        if best is None:
+            intra = intra_override or budget
+            config = ParallelismConfig(intra, inter_op, workers_override or 1, mode, "default", available, budget)
+        else:
+            intra, workers, score = best
+            if workers_override:
+                workers = workers_override
+            elif mode == "latency":
+                # Requests should not compete for the cores the fastest setting needs
+                workers = min(max_workers, max(1, budget // intra))
+            config = ParallelismConfig(intra, inter_op, workers, mode, "autotuned", available, budget, round(score, 4))
+
+    config = config._replace(memory_worker_cap=memory_cap)
+    torch.set_num_threads(config.intra_op_threads)
+    logger.info(
+        f"🧵 Parallelism ({config.source}, {config.mode}): {config.intra_op_threads} intra-op, "
+        f"{config.inter_op_threads} inter-op, {config.workers} workers on {available} CPUs"
+    )
+    return config
@@ -0,0 +1,139 @@
+import mmap
+import struct
+import numpy as np
+import torch
+from typing import NamedTuple, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+# WAVE format tags we can decode ourselves
+WAVE_FORMAT_PCM = 0x0001
+WAVE_FORMAT_IEEE_FLOAT = 0x0003
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+# Frames converted to float per step, bounds the temporary memory of the conversion
+CONVERT_CHUNK_FRAMES = 64 * 1024
+
+# (format tag, bits per sample) -> (numpy dtype, offset, scale) matching torchaudio's normalization
+SAMPLE_FORMATS = {
+    (WAVE_FORMAT_PCM, 8): (np.dtype("u1"), 128.0, 1.0 / 128.0),
+    (WAVE_FORMAT_PCM, 16): (np.dtype("<i2"), 0.0, 1.0 / 32768.0),
+    (WAVE_FORMAT_PCM, 32): (np.dtype("<i4"), 0.0, 1.0 / 2147483648.0),
+    (WAVE_FORMAT_IEEE_FLOAT, 32): (np.dtype("<f4"), 0.0, 1.0),
+    (WAVE_FORMAT_IEEE_FLOAT, 64): (np.dtype("<f8"), 0.0, 1.0),
+}
+
+class WavHeader(NamedTuple):
+    format_tag: int
+    channels: int
+    sample_rate: int
+    bits_per_sample: int
+    data_offset: int
+    num_frames: int
+
+def parse_wav_header(buffer) -> Optional[WavHeader]:
+    """Parse a little-endian RIFF/WAVE header, returning None for anything we don't handle"""
+    view = memoryview(buffer)
+    if len(view) < 12 or bytes(view[0:4]) != b"RIFF" or bytes(view[8:12]) != b"WAVE":
+        return None
+
+    fmt = None
+    offset = 12
+    while offset + 8 <= len(view):
+        chunk_id = bytes(view[offset:offset + 4])
+        chunk_size = struct.unpack_from("<I", view, offset + 4)[0]
+        body = offset + 8
+
+        if chunk_id == b"fmt ":
+            if chunk_size < 16 or body + chunk_size > len(view):
+                return None
+            format_tag, channels, sample_rate, _, block_align, bits = struct.unpack_from("<HHIIHH", view, body)
+            if format_tag == WAVE_FORMAT_EXTENSIBLE:
+                # The real format tag is the first two bytes of the SubFormat GUID
+                if chunk_size < 40:
+                    return None
+                format_tag = struct.unpack_from("<H", view, body + 24)[0]
+            fmt = (format_tag, channels, sample_rate, block_align, bits)
+
+        elif chunk_id == b"data":
+            if fmt is None:
+                return None
+            format_tag, channels, sample_rate, block_align, bits = fmt
+            if channels == 0 or block_align != channels * bits // 8:
+                return None
+            # Streaming writers leave the size unset, so clamp to what we actually have
+            data_size = min(chunk_size, len(view) - body)
+            return WavHeader(format_tag, channels, sample_rate, bits, body, data_size // block_align)
+
+        # Chunks are word aligned
+        offset = body + chunk_size + (chunk_size & 1)
+
+    return None
+
+def pcm_to_tensor(buffer, header: WavHeader) -> Optional[torch.Tensor]:
+    """View the data region of a parsed WAV as a (channels, frames) float32 tensor"""
+    sample_format = SAMPLE_FORMATS.get((header.format_tag, header.bits_per_sample))
+    if sample_format is None:
+        return None
+    dtype, sample_offset, scale = sample_format
+
+    # Zero-copy view over the upload (or the copy-on-write mapping of the file)
+    samples = np.frombuffer(
+        buffer,
+        dtype=dtype,
+        count=header.num_frames * header.channels,
+        offset=header.data_offset
+    ).reshape(header.num_frames, header.channels)
+
+    if dtype == np.float32:
+        if not samples.flags.writeable:
+            # Immutable bytes can't back a tensor safely, so pay for one copy
+            return torch.from_numpy(samples.copy()).T
+        # Already in the model's format, the tensor shares memory with the buffer
+        return torch.from_numpy(samples).T
+
+    # Convert chunk by chunk straight into the output, no full-size intermediate array
+    waveform = torch.empty((header.channels, header.num_frames), dtype=torch.float32)
+    out = waveform.numpy()
+    for start in range(0, header.num_frames, CONVERT_CHUNK_FRAMES):
+        end = min(start + CONVERT_CHUNK_FRAMES, header.num_frames)
+        block = out[:, start:end]
+        block[...] = samples[start:end].T
+        if sample_offset:
+            block -= sample_offset
+        if scale != 1.0:
+            block *= scale
+    return waveform
+
+def decode_wav_bytes(audio_bytes: bytes) -> Optional[Tuple[torch.Tensor, int]]:
+    """Fast-path decode of in-memory WAV bytes, None means use torchaudio instead"""
+    try:
+        header = parse_wav_header(audio_bytes)
+        if header is None:
+            return None
+        waveform = pcm_to_tensor(audio_bytes, header)
+        if waveform is None:
+            return None
+        return waveform, header.sample_rate
+    except Exception as e:
+        logger.warning(f"⚠️ Fast WAV decode failed, falling back to torchaudio: {str(e)}")
+        return None
+
+def decode_wav_file(path: str) -> Optional[Tuple[torch.Tensor, int]]:
+    """Fast-path decode of a WAV file on disk through mmap, None means use torchaudio instead"""
+    try:
+        with open(path, "rb") as f:
+            # Copy-on-write keeps the view writable without touching the file; the mapping
+            # outlives the file handle and is released with the last view on it
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+        header = parse_wav_header(mapped)
+        if header is None:
+            return None
+        waveform = pcm_to_tensor(mapped, header)
+        if waveform is None:
+            return None
+        return waveform, header.sample_rate
+    except Exception as e:
+        logger.warning(f"⚠️ Fast WAV decode failed for {path}, falling back to torchaudio: {str(e)}")
+        return None
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+API process startup benchmark: import time and idle RSS of app.main
+
+Each measurement runs in a fresh interpreter so nothing is already imported.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEAVY_MODULES = ("torch", "torchaudio", "speechbrain", "numpy")
+
+PROBE = """
+import json, sys, time
+sys.path.insert(0, {root!r})
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+rss_kb = 0
+try:
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                rss_kb = int(line.split()[1])
+except OSError:
+    import resource
+    rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({{
+    "import_s": elapsed,
+    "rss_mb": rss_kb / 1024,
+    "heavy": [m for m in {heavy!r} if m in sys.modules],
+}}))
+"""
+
+def probe(module: str) -> dict:
+    """Import `module` in a fresh interpreter and report its cost"""
+    code = PROBE.format(root=ROOT, module=module, heavy=HEAVY_MODULES)
+    result = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--with-ml", action="store_true", help="also measure the inference worker's imports")
+    args = parser.parse_args()
+
+    modules = [("API process", "app.main")]
+    if args.with_ml:
+        modules.append(("inference worker", "app.services.audio_service"))
+
+    print(f"{'process':<18} {'best import (s)':>16} {'idle RSS (MB)':>14}  heavy modules loaded")
+    for label, module in modules:
+        runs = [probe(module) for _ in range(args.repeats)]
+        best = min(r["import_s"] for r in runs)
+        rss = min(r["rss_mb"] for r in runs)
+        heavy = ", ".join(runs[0]["heavy"]) or "none"
+        print(f"{label:<18} {best:>16.3f} {rss:>14.1f}  {heavy}")
+
+if __name__ == "__main__":
+    main()
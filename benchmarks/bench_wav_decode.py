@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+WAV decode benchmark: torchaudio.load vs the zero-copy fast path
+
+Each decode runs in a fresh process so peak RSS is not polluted by the other path.
+"""
+import argparse
+import io
+import multiprocessing
+import os
+import queue
+import resource
+import sys
+import time
+import wave
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def make_wav(seconds: float, sample_rate: int, channels: int) -> bytes:
+    """Build a synthetic 16-bit PCM WAV in memory"""
+    import numpy as np
+
+    frames = int(seconds * sample_rate)
+    t = np.arange(frames) / sample_rate
+    tone = 0.3 * np.sin(2 * np.pi * 440.0 * t) + 0.05 * np.random.randn(frames)
+    pcm = (np.clip(tone, -1.0, 1.0) * 32767).astype("<i2")
+    pcm = np.repeat(pcm[:, None], channels, axis=1)
+
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as f:
+        f.setnchannels(channels)
+        f.setsampwidth(2)
+        f.setframerate(sample_rate)
+        f.writeframes(pcm.tobytes())
+    return buffer.getvalue()
+
+def run_decode(path: str, method: str, repeats: int, results):
+    """Child process: decode the file `repeats` times and report timing and peak RSS"""
+    import torchaudio
+    from app.services.wav_decoder import decode_wav_bytes, decode_wav_file
+
+    with open(path, "rb") as f:
+        audio_bytes = f.read()
+
+    decoders = {
+        "torchaudio": lambda: torchaudio.load(io.BytesIO(audio_bytes)),
+        "fast_bytes": lambda: decode_wav_bytes(audio_bytes),
+        "fast_mmap": lambda: decode_wav_file(path),
+    }
+    decode = decoders[method]
+
+    # Imports and the input buffer are already resident, growth past this point is the decode
+    baseline_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        waveform, _ = decode()
+        # Touch the data so lazy paths pay their full cost
+        float(waveform.sum())
+        timings.append(time.perf_counter() - start)
+        del waveform
+
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    results.put((method, min(timings), sum(timings) / len(timings), peak_kb, peak_kb - baseline_kb))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--seconds", type=float, default=300.0)
+    parser.add_argument("--sample-rate", type=int, default=44100)
+    parser.add_argument("--channels", type=int, default=2)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--timeout", type=float, default=600.0, help="seconds allowed per method")
+    args = parser.parse_args()
+
+    import tempfile
+
+    audio_bytes = make_wav(args.seconds, args.sample_rate, args.channels)
+    with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as f:
+        f.write(audio_bytes)
+        path = f.name
+
+    print(f"🎵 {args.seconds:.0f}s, {args.sample_rate}Hz, {args.channels}ch, {len(audio_bytes) / 1e6:.1f} MB")
+    print(f"{'method':<12} {'best (ms)':>10} {'mean (ms)':>10} {'peak RSS (MB)':>14} {'decode RSS (MB)':>16}")
+
+    ctx = multiprocessing.get_context("spawn")
+    failed = False
+    try:
+        for method in ("torchaudio", "fast_bytes", "fast_mmap"):
+            results = ctx.Queue()
+            proc = ctx.Process(target=run_decode, args=(path, method, args.repeats, results))
+            proc.start()
+
+            # A child that crashes never reports, so don't wait on it forever
+            result = None
+            deadline = time.monotonic() + args.timeout
+            while result is None and time.monotonic() < deadline:
+                try:
+                    result = results.get(timeout=1.0)
+                except queue.Empty:
+                    if not proc.is_alive():
+                        try:
+                            result = results.get_nowait()
+                        except queue.Empty:
+                            break
+
+            if proc.is_alive() and result is None:
+                proc.terminate()
+            proc.join()
+
+            if result is None:
+                print(f"{method:<12} failed (exit code {proc.exitcode})")
+                failed = True
+                continue
+            name, best, mean, peak_kb, delta_kb = result
+            print(f"{name:<12} {best * 1e3:>10.1f} {mean * 1e3:>10.1f} {peak_kb / 1024:>14.1f} {delta_kb / 1024:>16.1f}")
+    finally:
+        os.unlink(path)
+
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+WAV decode parity check: the fast paths must match torchaudio.load sample for sample
+
+Covers 8/16/32-bit PCM, 32/64-bit float and WAVE_FORMAT_EXTENSIBLE input, with an extra
+odd-sized chunk before the data. Exits non-zero on any mismatch.
+"""
+import io
+import os
+import struct
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import torch
+import torchaudio
+from app.services.wav_decoder import (
+    WAVE_FORMAT_EXTENSIBLE, WAVE_FORMAT_IEEE_FLOAT, WAVE_FORMAT_PCM, decode_wav_bytes, decode_wav_file
+)
+
+SAMPLE_RATE = 22050
+FRAMES = 3001  # odd, so data and chunk padding paths are exercised
+
+# Name, format tag, bits per sample, dtype, full scale
+CASES = [
+    ("pcm_u8", WAVE_FORMAT_PCM, 8, "u1", None),
+    ("pcm_s16", WAVE_FORMAT_PCM, 16, "<i2", 32767),
+    ("pcm_s32", WAVE_FORMAT_PCM, 32, "<i4", 2147483647),
+    ("float32", WAVE_FORMAT_IEEE_FLOAT, 32, "<f4", None),
+    ("float64", WAVE_FORMAT_IEEE_FLOAT, 64, "<f8", None),
+]
+
+# KSDATAFORMAT_SUBTYPE GUID tail shared by PCM and IEEE float
+GUID_TAIL = b"\x00\x00\x00\x00\x10\x00\x80\x00\x00\xaa\x00\x38\x9b\x71"
+
+def make_samples(dtype: str, full_scale, channels: int) -> bytes:
+    rng = np.random.default_rng(0)
+    signal = np.clip(rng.uniform(-1.0, 1.0, (FRAMES, channels)), -1.0, 1.0)
+    if dtype == "u1":
+        data = np.round(signal * 127 + 128).astype("u1")
+    elif full_scale:
+        data = np.round(signal * full_scale).astype(dtype)
+    else:
+        data = signal.astype(dtype)
+    return data.tobytes()
+
+def make_wav(format_tag: int, bits: int, channels: int, data: bytes, extensible: bool) -> bytes:
+    block_align = channels * bits // 8
+    byte_rate = SAMPLE_RATE * block_align
+    if extensible:
+        fmt = struct.pack(
+            "<HHIIHHHHI", WAVE_FORMAT_EXTENSIBLE, channels, SAMPLE_RATE, byte_rate, block_align, bits,
+            22, bits, 0
+        ) + struct.pack("<H", format_tag) + GUID_TAIL
+    else:
+        fmt = struct.pack("<HHIIHH", format_tag, channels, SAMPLE_RATE, byte_rate, block_align, bits)
+
+    chunks = b"fmt " + struct.pack("<I", len(fmt)) + fmt
+    chunks += b"LIST" + struct.pack("<I", 3) + b"abc\x00"  # odd size plus pad byte
+    chunks += b"data" + struct.pack("<I", len(data)) + data + (b"\x00" if len(data) & 1 else b"")
+    return b"RIFF" + struct.pack("<I", 4 + len(chunks)) + b"WAVE" + chunks
+
+def check(name: str, wav: bytes) -> bool:
+    expected, expected_rate = torchaudio.load(io.BytesIO(wav))
+
+    with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as f:
+        f.write(wav)
+        path = f.name
+    try:
+        results = {"bytes": decode_wav_bytes(wav), "mmap": decode_wav_file(path)}
+        ok = True
+        for method, decoded in results.items():
+            if decoded is None:
+                print(f"❌ {name} ({method}): fell back to torchaudio")
+                ok = False
+                continue
+            waveform, sample_rate = decoded
+            if sample_rate != expected_rate or waveform.shape != expected.shape:
+                print(f"❌ {name} ({method}): {tuple(waveform.shape)} @ {sample_rate}Hz, "
+                      f"expected {tuple(expected.shape)} @ {expected_rate}Hz")
+                ok = False
+                continue
+            # Writable, so in-place ops downstream are safe
+            waveform.add_(0.0)
+            error = (waveform - expected).abs().max().item()
+            if not torch.allclose(waveform, expected, atol=1e-6):
+                print(f"❌ {name} ({method}): max abs error {error:.2e}")
+                ok = False
+            else:
+                print(f"✅ {name} ({method}): max abs error {error:.2e}")
+        del results
+        return ok
+    finally:
+        os.unlink(path)
+
+def main():
+    ok = True
+    for channels in (1, 2):
+        for name, format_tag, bits, dtype, full_scale in CASES:
+            data = make_samples(dtype, full_scale, channels)
+            for extensible in (False, True):
+                label = f"{name}{'_ext' if extensible else ''}_{channels}ch"
+                ok &= check(label, make_wav(format_tag, bits, channels, data, extensible))
+    sys.exit(0 if ok else 1)
+
+if __name__ == "__main__":
+    main()